@@ -1,55 +1,125 @@
 import csv
 import time
+import threading
+import httpx
+import random
 import base64
+import asyncio
 import requests
-import numpy as np
 import pandas as pd
 
 from typing import *
 from io import BytesIO, StringIO
+from collections import OrderedDict
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from PIL import Image
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from urllib3.exceptions import HTTPError as Urllib3HTTPError
 
 Response = Tuple[int, Type[requests.models.Response]]
 Method = Literal['GET', 'POST', 'PUT']
 Json = Dict
 Date = str
 
-class BolAPI:
-    """ Super class for bol.com API
-    
+class _HTTPBackend:
+    """ Connection and access token shared between bol.com API classes
+
     Attributes
     ----------
-    client_id : str        
-        ID from client credentials 
-    client_secret : str    
-        Secret from client credentials 
-    base_url : str         
-        Initial part of the API URL for all requests
-    headers : dict         
-        API Headers containing:
-            - Authentication credentials (Authorization)
-            - Expected content type received in response (Accept)
-            - Media type of current request body (Content-Type)
+    _basic_auth : str
+        Authorization header built from the client credentials (ID and secret)
+    headers : dict
+        Authentication credentials (Authorization) sent with every API request
+    session : requests.Session
+        Persistent session, reuses pooled connections between requests
+    valid : bool
+        Whether the last access token request succeeded
+    _token_expiry : float
+        Monotonic time after which the access token should be refreshed
+    _token_lock : threading.Lock
+        Ensures only one thread refreshes the access token at a time
     """
+
+    TOKEN_URL = 'https://login.bol.com/token?grant_type=client_credentials'
+    TOKEN_TIMEOUT = (5, 10) # (connect, read) timeout in seconds
+
     def __init__(self, client_id: str, client_secret: str) -> None:
-        self.client_id = client_id
-        self.client_secret = client_secret
-        self.base_url = "https://api.bol.com"
+        if not client_id or not client_secret:
+            raise ValueError('client_id and client_secret are required when no backend is given')
+
+        credentials = base64.b64encode(f'{client_id}:{client_secret}'.encode()).decode('ascii')
+        self._basic_auth = f'Basic {credentials}'
+        self.headers = {}
         self.valid = None
+        self._token_expiry = None
+        self._token_lock = threading.Lock()
+
+        # Keep connections alive between requests to avoid repeated TCP/TLS handshakes
+        # A persistent 5xx is returned as response rather than raised, like other errors.
+        # Connection errors, timeouts and 429s are left to BolAPI.request to retry
+        retries = Retry(total=3, connect=False, read=False, backoff_factor=0.3, 
+                        status_forcelist=[500, 502, 503, 504], raise_on_status=False,
+                        respect_retry_after_header=False)
+        adapter = HTTPAdapter(pool_connections=10, pool_maxsize=32, max_retries=retries)
+        self.session = requests.Session()
+        self.session.mount('https://', adapter)
+
+    def token_expired(self) -> bool:
+        return self._token_expiry is None or time.monotonic() >= self._token_expiry
+
+    def credentials_header(self) -> dict:
+        return {
+            'Accept' : 'application/json',
+            'Authorization': self._basic_auth
+        }
 
     def get_access_token(self) -> None:
         """ Obtain access token
 
         Acquire a token from the authentication service using
-        client credentials and set the token as an authorization header
+        client credentials and set the token as an authorization header.
+        The token is refreshed 30 seconds before it expires.
         """
-        credentials = base64.b64encode(bytes(f"{self.client_id}:{self.client_secret}", "utf-8")).decode("utf-8")
-        credentials_header = {
-            'Accept' : 'application/json',
-            'Authorization': f'Basic {credentials}'
-        }
+        with self._token_lock:
+            self._request_access_token()
+
+    def refresh_access_token(self, stale: Optional[str] = None) -> None:
+        """ Obtain access token if there is none or it is about to expire
+
+        Threads waiting for another thread's refresh reuse its token.
+
+        Parameters
+        ----------
+        stale : str
+            Optional; Authorization header that was rejected, 
+            forces a refresh if it is still in use (default is None)
+        """
+        with self._token_lock:
+            if self.token_expired() or self.headers.get('Authorization') == stale:
+                self._request_access_token()
+
+    def _request_access_token(self) -> None:
+        try:
+            request = self.session.post(self.TOKEN_URL, headers=self.credentials_header(), timeout=self.TOKEN_TIMEOUT)
+        except (requests.Timeout, requests.ConnectionError) as e:
+            print(f'ERROR: failed to retrieve access token \n {e!r}')
+            self.valid = False
+            self._token_expiry = None
+            return
 
-        request = requests.post('https://login.bol.com/token?grant_type=client_credentials', headers=credentials_header)
+        self.store_access_token(request)
+
+    def store_access_token(self, request: Any) -> None:
+        """ Set the access token from a token endpoint response
+
+        Parameters
+        ----------
+        request : requests.Response or httpx.Response
+            Response of the authentication service
+        """
         status = request.status_code
         response = request.json()
 
@@ -58,18 +128,216 @@ class BolAPI:
             access_token = response['access_token']
             bearer_str = f'Bearer {access_token}'
             self.headers.update({'Authorization' : bearer_str})
+            self.session.headers.update(self.headers) # Applied by default to every request
+            self._token_expiry = time.monotonic() + response['expires_in'] - 30
             return
         
         else:
             print(f'ERROR: failed to retrieve access token \n {request}')
             self.valid = False
+            self._token_expiry = None
             return
 
-    def request(self, method: Method, url: str, data: Optional[dict] = None, headers: Optional[dict] = None) -> Response:
+
+class BolAPI:
+    """ Super class for bol.com API
+    
+    Attributes
+    ----------
+    base_url : str         
+        Initial part of the API URL for all requests
+    headers : dict         
+        API Headers containing:
+            - Expected content type received in response (Accept)
+            - Media type of current request body (Content-Type)
+    backend : _HTTPBackend
+        Connection and access token, can be shared between API classes
+    session : requests.Session
+        Persistent session of the backend, reuses pooled connections between requests
+    _etag_cache : OrderedDict
+        Last ETag and response per GET url and Accept header, used for conditional requests
+    """
+
+    # Maximum no. cached GET responses, least recently used ones are evicted first
+    ETAG_CACHE_SIZE = 1024
+
+    # Maximum no. attempts per request when denied, rate-limited or timed out
+    MAX_ATTEMPTS = 5
+
+    # (connect, read) timeouts in seconds
+    DEFAULT_TIMEOUT = (5, 60)
+    IMAGE_TIMEOUT = (5, 30)
+    REPORT_TIMEOUT = (5, 300)
+
+    # Drops the API headers for downloads outside api.bol.com, e.g. reports and images
+    _EXTERNAL_HEADERS = {
+        'Authorization' : None,
+        'Accept' : None,
+        'Content-Type' : None
+    }
+
+    def __init__(self, client_id: Optional[str] = None, client_secret: Optional[str] = None, backend: Optional[_HTTPBackend] = None) -> None:
+        self.base_url = "https://api.bol.com"
+        self.headers = {}
+        self.backend = backend or _HTTPBackend(client_id, client_secret)
+        self.session = self.backend.session
+        self._etag_cache = OrderedDict()
+        self._etag_lock = threading.Lock()
+
+    @property
+    def valid(self) -> Optional[bool]:
+        return self.backend.valid
+
+    def get_access_token(self) -> None:
+        """ Obtain access token
+
+        See _HTTPBackend.get_access_token
+        """
+        self.backend.get_access_token()
+
+    def _ensure_access_token(self) -> None:
+        """ Obtain access token if there is none or it is about to expire
+        """
+        if self.backend.token_expired():
+            self.backend.refresh_access_token()
+
+    @staticmethod
+    def _backoff_delay(attempt: int, base: float = 2.0, cap: float = 300.0) -> float:
+        """ Compute waiting time with exponential backoff and jitter
+
+        Parameters
+        ----------
+        attempt : int
+            No. previous attempts, doubles the waiting time for each attempt
+        base : float
+            Optional; Waiting time in seconds for the first attempt (default is 2.0)
+        cap : float
+            Optional; Maximum waiting time in seconds (default is 300.0)
+
+        Returns
+        -------
+        float
+            Waiting time in seconds
+        """
+        delay = min(cap, base * 2 ** attempt)
+        return delay * (0.5 + random.random() / 2)
+
+    @classmethod
+    def _sleep_backoff(cls, attempt: int, base: float = 2.0, cap: float = 300.0) -> None:
+        """ Sleep with exponential backoff and jitter
+
+        Parameters
+        ----------
+        attempt : int
+            No. previous attempts, doubles the waiting time for each attempt
+        base : float
+            Optional; Waiting time in seconds for the first attempt (default is 2.0)
+        cap : float
+            Optional; Maximum waiting time in seconds (default is 300.0)
+        """
+        time.sleep(cls._backoff_delay(attempt, base, cap))
+
+    @classmethod
+    def _retry_after_delay(cls, retry_after: Optional[str], attempt: int) -> float:
+        """ Compute waiting time requested by a Retry-After header
+
+        The header holds either a no. seconds or an HTTP date, 
+        falls back to exponential backoff if it is missing or invalid.
+
+        Parameters
+        ----------
+        retry_after : str
+            Value of the Retry-After header, None if not given
+        attempt : int
+            No. previous attempts, used for the backoff
+
+        Returns
+        -------
+        float
+            Waiting time in seconds
+        """
+        if retry_after:
+            try:
+                return max(0.0, float(retry_after))
+            except ValueError:
+                pass
+            try:
+                retry_date = parsedate_to_datetime(retry_after)
+                return max(0.0, (retry_date - datetime.now(timezone.utc)).total_seconds())
+            except (TypeError, ValueError):
+                pass
+        return cls._backoff_delay(attempt)
+
+    def _download_csv(self, download_url: str) -> pd.DataFrame:
+        """ Download a csv report into a DataFrame
+
+        Streams the report into the csv parser instead of buffering it.
+
+        Parameters
+        ----------
+        download_url : str
+            Location of the report, outside api.bol.com
+
+        Returns
+        -------
+        pd.DataFrame
+            DataFrame containing the report
+        """
+        try:
+            with self.session.get(download_url, stream=True, headers=self._EXTERNAL_HEADERS, timeout=self.REPORT_TIMEOUT) as report:
+                if report.status_code == 200:
+                    report.raw.decode_content = True
+                    return pd.read_csv(report.raw, encoding='utf-8')
+
+                else: print(f'ERROR: failed to download report \n{report.status_code} {report.text}')
+
+        # The stream raises urllib3 errors when it stalls while being parsed
+        except (requests.Timeout, requests.ConnectionError, Urllib3HTTPError) as e:
+            print(f'ERROR: failed to download report \n{e!r}')
+
+    def _await_process(self, process_id: str, timeout_s: int = 3600) -> Json:
+        """ Wait until a process has finished
+
+        Polls the process status with exponential backoff of up to 60 seconds,
+        returns immediately if the process has already finished.
+
+        Parameters
+        ----------
+        process_id : str
+            The ID of the process status
+        timeout_s : int
+            Optional; Maximum no. seconds to wait (default is 3600)
+
+        Returns
+        -------
+        dict
+            Json-formatted dictionary containing the final process status
+        """
+        endpoint_url = f'shared/process-status/{process_id}'
+        deadline = time.monotonic() + timeout_s
+        attempt = 0
+
+        while time.monotonic() < deadline:
+            _, process = self.get(endpoint_url)
+            process_json = process.json()
+            if process_json['status'] != 'PENDING':
+                return process_json
+
+            self._sleep_backoff(attempt, cap=60.0) # Wait up to 60 seconds
+            attempt += 1
+
+        raise TimeoutError(f'Process {process_id} still pending after {timeout_s} seconds')
+
+    def request(self, method: Method, url: str, data: Optional[dict] = None, headers: Optional[dict] = None, params: Optional[dict] = None) -> Response:
         """ Send a request to api.bol.com
 
         Configures the request and returns its status code with the response body.
-        In case the access token has expired, new one will be requested.
+        In case the access token is about to expire, new one will be requested.
+        Denied, rate-limited and timed out requests are retried up to MAX_ATTEMPTS times.
+        POST requests are only retried after a connect timeout, as the server 
+        may otherwise already have received them.
+        JSON responses to GET requests are cached by ETag, an unchanged resource
+        returns the cached response without transferring the body again.
 
         Parameters
         ----------
@@ -78,9 +346,11 @@ class BolAPI:
         url : str    
             Endpoint location, appends to self.base_url
         data : dict  
-            Optional; Query Parameters (default is None)
+            Optional; Query Parameters, or request body for POST (default is None)
         headers : dict  
-            Optional; Header Parameters (default is self.headers)
+            Optional; Header Parameters, merged with self.headers (default is None)
+        params : dict
+            Optional; Query Parameters, merged with data for GET and PUT (default is None)
 
         Returns
         -------
@@ -89,49 +359,91 @@ class BolAPI:
         request : Any           
             Request response
         """
-        # Update headers if necessary
+        # Refresh access token before it expires
+        self._ensure_access_token()
+
+        # Set the request url
+        request_url = f'{self.base_url}/{url}'
+
+        # The session adds the shared Authorization header to these
         if headers:
-            headers_ = self.headers.copy()
-            headers_.update(headers)
-            headers = headers_
+            headers = {**self.headers, **headers}
         else:
             headers = self.headers
-        
-        # Set the request url
-        request_url = f'{self.base_url}/{url}'
 
-        # Make request
-        if method == 'GET':
-            request = requests.get(request_url, params=data, headers=headers)
-        elif method == 'POST':
-            request = requests.post(request_url, headers=headers, json=data)
-        elif method == 'PUT':
-            request = requests.put(request_url, params=data, headers=headers)
-        
-        # Check if request has been denied due to token expiration
-        status_code = request.status_code
-        if status_code == 401:
-            print('Token expired, acquiring new one...')
-            self.get_access_token()
-            return self.request(method, url, data, headers)
-
-        if status_code == 429:
-            print('Too many requests, retrying after 1550 seconds')
-            time.sleep(1550)
-            return  self.request(method, url, data, headers)
+        # POST sends data as body while GET/PUT send it as query parameters
+        if method == 'POST':
+            body, query = data, params
         else:
+            body, query = None, {**(data or {}), **(params or {})}
+
+        # Ask to only send the body if it changed since the cached response
+        cache_key = None
+        cached = None
+        if method == 'GET':
+            # Prepared url handles any query parameter requests accepts, e.g. lists
+            prepared_url = requests.Request(method, request_url, params=query).prepare().url
+            cache_key = (prepared_url, headers.get('Accept'))
+            with self._etag_lock:
+                cached = self._etag_cache.get(cache_key)
+                if cached:
+                    self._etag_cache.move_to_end(cache_key)
+            if cached:
+                headers = {**headers, 'If-None-Match' : cached[0]}
+
+        last_error = None
+        for attempt in range(self.MAX_ATTEMPTS):
+            # Make request
+            try:
+                request = self.session.request(method, request_url, params=query, json=body, headers=headers, timeout=self.DEFAULT_TIMEOUT)
+            except (requests.Timeout, requests.ConnectionError) as e:
+                if method == 'POST' and not isinstance(e, requests.ConnectTimeout):
+                    raise
+                last_error = e
+                if attempt < self.MAX_ATTEMPTS - 1:
+                    print('Request failed to connect or timed out, retrying with backoff')
+                    self._sleep_backoff(attempt)
+                continue
+            
+            # Check if request has been denied due to token expiration
+            status_code = request.status_code
+            if status_code == 401:
+                print('Token expired, acquiring new one...')
+                self.backend.refresh_access_token(stale=request.request.headers.get('Authorization'))
+                continue
+
+            if status_code == 429:
+                if attempt < self.MAX_ATTEMPTS - 1:
+                    delay = self._retry_after_delay(request.headers.get('Retry-After'), attempt)
+                    print(f'Too many requests, retrying after {delay:.0f} seconds')
+                    time.sleep(delay)
+                continue
+
+            if status_code == 304 and cached:
+                return cached[1].status_code, cached[1]
+
+            etag = request.headers.get('ETag')
+            if cache_key and status_code == 200 and etag and 'json' in request.headers.get('Content-Type', ''):
+                with self._etag_lock:
+                    self._etag_cache[cache_key] = (etag, request)
+                    self._etag_cache.move_to_end(cache_key)
+                    if len(self._etag_cache) > self.ETAG_CACHE_SIZE:
+                        self._etag_cache.popitem(last=False)
+
             return status_code, request
+
+        raise RuntimeError(f'{method} {url} failed after {self.MAX_ATTEMPTS} attempts') from last_error
     
-    def get(self, url: str, data: Optional[dict] = None, headers: Optional[dict] = None) -> Response:
-        status, response = self.request('GET', url, data, headers)
+    def get(self, url: str, data: Optional[dict] = None, headers: Optional[dict] = None, params: Optional[dict] = None) -> Response:
+        status, response = self.request('GET', url, data, headers, params)
         return status, response
     
-    def post(self, url: str, data: Optional[dict] = None, headers: Optional[dict] = None) -> Response:
-        status, response = self.request('POST', url, data, headers)
+    def post(self, url: str, data: Optional[dict] = None, headers: Optional[dict] = None, params: Optional[dict] = None) -> Response:
+        status, response = self.request('POST', url, data, headers, params)
         return status, response
     
-    def put(self, url: str, data: Optional[dict] = None, headers: Optional[dict] = None) -> Response:
-        status, response = self.request('PUT', url, data, headers)
+    def put(self, url: str, data: Optional[dict] = None, headers: Optional[dict] = None, params: Optional[dict] = None) -> Response:
+        status, response = self.request('PUT', url, data, headers, params)
         return status, response
 
 
@@ -139,13 +451,23 @@ class BolRetailerAPI(BolAPI):
     """ Initializes API connection with bol Retailer API
     """
 
-    def __init__(self, client_id: str, client_secret: str) -> None:
-        super().__init__(client_id, client_secret)   
+    # Headers overriding self.headers for non-json endpoints
+    _INVOICE_HEADERS = {
+        'Accept' : 'application/vnd.retailer.v10+openxmlformats-officedocument.spreadsheetml.sheet',
+        'Content-Type' : 'None'
+    }
+    _OFFER_EXPORT_HEADERS = {
+        'Accept' : 'application/vnd.retailer.v9+csv',
+        'Content-Type' : 'application/x-www-form-urlencoded'
+    }
+
+    def __init__(self, client_id: Optional[str] = None, client_secret: Optional[str] = None, backend: Optional[_HTTPBackend] = None) -> None:
+        super().__init__(client_id, client_secret, backend)
         self.headers = {
             'Accept' : 'application/vnd.retailer.v9+json',
             'Content-Type' : 'application/vnd.retailer.v9+json'
         }
-        self.get_access_token()
+        self._ensure_access_token()
 
     def request_invoice_specification(self, invoice_id: str) -> pd.DataFrame:
         """ Retrieve invoice specification by invoice ID
@@ -160,18 +482,12 @@ class BolRetailerAPI(BolAPI):
         json               
             Json-format dict containing all details in invoice specification
         """
-        headers = {
-            'Accept' : 'application/vnd.retailer.v10+openxmlformats-officedocument.spreadsheetml.sheet',
-            'Content-Type' : 'None'
-        }
         endpoint_url = f'retailer/invoices/{invoice_id}/specification'
-        status, response = self.get(endpoint_url, headers=headers)
+        status, response = self.get(endpoint_url, headers=self._INVOICE_HEADERS)
         
         if status == 200:
-            df = pd.read_excel(response.content)
-            df.rename(columns=df.iloc[6], inplace=True) # Set row 6 as column headers
-            df.drop(np.arange(0,7), inplace=True) # Remove first 7 rows that aren't part of table
-            df.reset_index(drop=True, inplace=True) # Reset the indexing
+            # Row 7 holds the column headers, the rows above aren't part of table
+            df = pd.read_excel(BytesIO(response.content), engine='openpyxl', header=7)
             return df
             
         else: print(f'ERROR: failed to retrieve invoice specification \n{response.text}')
@@ -210,28 +526,18 @@ class BolRetailerAPI(BolAPI):
 
         if status == 202:
             # Check status of offer export
-            process_id = response.json()['processStatusId']
-            endpoint_url = f'shared/process-status/{process_id}'
-            _, process = self.get(endpoint_url)
+            process_json = self._await_process(response.json()['processStatusId'])
             
-            while process.json()['status'] == 'PENDING':
-                time.sleep(60) # Wait 60 seconds
-                _, process = self.get(endpoint_url)
-            
-            if process.json()['status'] == 'SUCCESS':
-                report_id = process.json()['entityId']
+            if process_json['status'] == 'SUCCESS':
+                report_id = process_json['entityId']
                 endpoint_url = f'retailer/offers/export/{report_id}'
-                headers = {
-                    'Accept' : 'application/vnd.retailer.v9+csv',
-                    'Content-Type' : 'application/x-www-form-urlencoded'
-                }
-                status, response = self.get(endpoint_url, headers=headers)
+                status, response = self.get(endpoint_url, headers=self._OFFER_EXPORT_HEADERS)
                 
                 if status == 200:
                     return StringIO(response.content.decode('utf-8'))
                 
                 else: print(f'ERROR: failed to retrieve offer export \n{response.text}')
-            else: print(f'ERROR: failed to process offer export \n{process}')
+            else: print(f'ERROR: failed to process offer export \n{process_json}')
         else: 
             print(f'ERROR: failed to request offer export \n{response.text}')
             return response
@@ -293,8 +599,9 @@ class BolRetailerAPI(BolAPI):
         status, response = self.get(endpoint_url, data=data)
         
         if status == 200:
-            minimum = response.json()['total']['minimum']
-            maximum = response.json()["total"]["maximum"]
+            total = response.json()['total']
+            minimum = total['minimum']
+            maximum = total['maximum']
             
             return minimum, maximum
 
@@ -329,7 +636,7 @@ class BolRetailerAPI(BolAPI):
         dates : list       
             List of strings, contains the dates
         values : list     
-            List of floats, contains measured values
+            List of floats, contains measured values, None if missing
         """
 
         data = {
@@ -344,16 +651,20 @@ class BolRetailerAPI(BolAPI):
         
         if status == 200:
             response = response.json()
-            
+            periods = response['offerInsights'][0]['periods']
+
             dates = [] # The dates corresponding to measured value
             values = [] # Measured values per date
 
-            for i in response['offerInsights'][0]['periods']:
+            # No periods are returned when there are no insights yet, e.g. for a new offer
+            for i in periods:
                 date = i['period']
                 countries = i['countries']
 
                 if period == 'DAY':
                     date_str = f"{date['day']}-{date['month']}-{date['year']}"
+                elif period == 'WEEK':
+                    date_str = f"{date['week']}-{date['year']}"
                 elif period == 'MONTH':
                     date_str = f"{date['month']}-{date['year']}"
                 elif period == 'YEAR':
@@ -361,12 +672,12 @@ class BolRetailerAPI(BolAPI):
                 
                 dates.append(date_str)
 
-                for c in countries:
-                    if c['countryCode'] == country:
-                        values.append(c['value'])
+                # Stop at the first value of the country, None if it has no value this period
+                value = next((c['value'] for c in countries if c['countryCode'] == country), None)
+                values.append(value)
             
             if no_periods == 1:
-                return values[0]
+                return values[0] if values else None
             else:
                 if name == 'PRODUCT_VISITS':  
                     return {'Date': dates, 'Visits': values}
@@ -391,17 +702,59 @@ class BolRetailerAPI(BolAPI):
         img : PIL.Image
             Image of product
         """
-        endpoint_url = f'retailer/products/{ean}/assets?usage=PRIMARY'
-        status, response = self.get(endpoint_url)
+        data = {'usage' : 'PRIMARY'}
+        endpoint_url = f'retailer/products/{ean}/assets'
+        status, response = self.get(endpoint_url, data=data)
 
         if status == 200:
             img_url = response.json()['assets'][0]['variants'][0]['url']
-            img = Image.open(requests.get(img_url, stream=True).raw)
-            
-            return img
+            try:
+                img_response = self.session.get(img_url, headers=self._EXTERNAL_HEADERS, timeout=self.IMAGE_TIMEOUT)
+            except (requests.Timeout, requests.ConnectionError) as e:
+                print(f'ERROR: failed to download product\'s primary image \n{e!r}')
+                return
+
+            if img_response.status_code == 200:
+                # Decode now so the connection is released back to the pool
+                img = Image.open(BytesIO(img_response.content))
+                img.load()
+                return img
+
+            else: print(f'ERROR: failed to download product\'s primary image \n{img_response.status_code} {img_url}')
         
         else: print(f'ERROR: failed to retrieve product\'s primary image \n{response.text}')
 
+    def request_product_images_bulk(self, eans: List[str], max_workers: int = 16) -> Dict[str, Image]:
+        """ Retrieve primary images of multiple products concurrently
+
+        Downloads are spread over a thread pool sharing the pooled session.
+
+        Parameters
+        ----------
+        eans : list
+            EANs of products
+        max_workers : int
+            Optional; No. concurrent downloads (default is 16)
+
+        Returns
+        -------
+        dict
+            Image of product per EAN, None if the image could not be retrieved
+        """
+        results = {}
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = {executor.submit(self.request_product_image, ean): ean for ean in eans}
+            for future in as_completed(futures):
+                ean = futures[future]
+                try:
+                    results[ean] = future.result()
+                except Exception as e:
+                    print(f'ERROR: failed to retrieve product\'s primary image of {ean} \n{e!r}')
+                    results[ean] = None
+
+        # Return in the order the EANs were requested
+        return {ean: results[ean] for ean in eans}
+
     def request_product_ratings(self, ean: str) -> Dict[int, int]:
         """ Retrieve product ratings by EAN
 
@@ -423,7 +776,7 @@ class BolRetailerAPI(BolAPI):
             'Count' : []
         }
 
-        endpoint_url = f'retailer/products/{ean}/raings'
+        endpoint_url = f'retailer/products/{ean}/ratings'
         status, response = self.get(endpoint_url)
 
         if status == 200:
@@ -435,6 +788,281 @@ class BolRetailerAPI(BolAPI):
 
         return dict_data
     
+class AsyncBolRetailerAPI:
+    """ Initializes asynchronous API connection with bol Retailer API
+
+    Requests are sent through a pooled httpx.AsyncClient, so the bulk
+    methods can retrieve many offers or products concurrently. 
+    The client is closed when leaving the context manager:
+
+        async def main():
+            async with AsyncBolRetailerAPI(client_id, client_secret) as api:
+                return await api.request_offers_bulk(offer_ids)
+
+        offers = asyncio.run(main())
+
+    Methods
+    -------
+    request_offers_bulk(offer_ids)
+        Retrieve multiple offers concurrently
+    request_offer_forecasts_bulk(offer_ids, weeks)
+        Retrieve sales forecasts of multiple offers concurrently
+    request_product_ratings_bulk(eans)
+        Retrieve ratings of multiple products concurrently
+
+    Attributes
+    ----------
+    base_url : str
+        Initial part of the API URL for all requests
+    headers : dict
+        API Headers containing expected and sent content type (Accept, Content-Type)
+    backend : _HTTPBackend
+        Access token, can be shared with the synchronous API classes
+    client : httpx.AsyncClient
+        Pooled asynchronous client used for all API requests, 
+        created within the running event loop
+    """
+
+    MAX_ATTEMPTS = BolAPI.MAX_ATTEMPTS
+    DEFAULT_TIMEOUT = BolAPI.DEFAULT_TIMEOUT
+
+    def __init__(self, client_id: Optional[str] = None, client_secret: Optional[str] = None, backend: Optional[_HTTPBackend] = None) -> None:
+        self.base_url = "https://api.bol.com"
+        self.backend = backend or _HTTPBackend(client_id, client_secret)
+        self.headers = {
+            'Accept' : 'application/vnd.retailer.v9+json',
+            'Content-Type' : 'application/vnd.retailer.v9+json'
+        }
+        self.client = None
+        self._token_lock = None
+        self._loop = None
+
+    async def __aenter__(self) -> 'AsyncBolRetailerAPI':
+        self._open()
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.aclose()
+
+    def _open(self) -> None:
+        """ Create the client and token lock for the running event loop
+
+        Both are bound to the loop they are first used in, so they 
+        are recreated when the instance is used in a new loop.
+        """
+        loop = asyncio.get_running_loop()
+        if self.client is None or self._loop is not loop:
+            self.client = httpx.AsyncClient(
+                base_url=self.base_url,
+                http2=True,
+                limits=httpx.Limits(max_connections=20, max_keepalive_connections=20),
+                timeout=httpx.Timeout(self.DEFAULT_TIMEOUT[1], connect=self.DEFAULT_TIMEOUT[0])
+            )
+            self._token_lock = asyncio.Lock()
+            self._loop = loop
+
+    @property
+    def valid(self) -> Optional[bool]:
+        return self.backend.valid
+
+    async def get_access_token(self, stale: Optional[str] = None) -> None:
+        """ Obtain access token without blocking the event loop
+
+        Only one coroutine refreshes the token at a time, the others
+        reuse the token it acquired.
+
+        Parameters
+        ----------
+        stale : str
+            Optional; Authorization header that was rejected, 
+            forces a refresh if it is still in use (default is None)
+        """
+        self._open()
+        async with self._token_lock:
+            if self.backend.token_expired() or self.backend.headers.get('Authorization') == stale:
+                timeout = httpx.Timeout(self.backend.TOKEN_TIMEOUT[1], connect=self.backend.TOKEN_TIMEOUT[0])
+                try:
+                    request = await self.client.post(self.backend.TOKEN_URL, headers=self.backend.credentials_header(), timeout=timeout)
+                except (httpx.TimeoutException, httpx.NetworkError) as e:
+                    print(f'ERROR: failed to retrieve access token \n {e!r}')
+                    self.backend.valid = False
+                    self.backend._token_expiry = None
+                    return
+
+                self.backend.store_access_token(request)
+
+    async def request(self, method: Method, url: str, data: Optional[dict] = None, headers: Optional[dict] = None, params: Optional[dict] = None) -> Response:
+        """ Send an asynchronous request to api.bol.com
+
+        See BolAPI.request, waits without blocking the event loop.
+        """
+        self._open()
+
+        # Refresh access token before it expires
+        if self.backend.token_expired():
+            await self.get_access_token()
+
+        # Update headers if necessary
+        request_headers = {**self.backend.headers, **self.headers, **(headers or {})}
+
+        # POST sends data as body while GET/PUT send it as query parameters
+        if method == 'POST':
+            body, query = data, params
+        else:
+            body, query = None, {**(data or {}), **(params or {})}
+
+        last_error = None
+        for attempt in range(self.MAX_ATTEMPTS):
+            # Make request, POST is only retried if it never reached the server
+            try:
+                request = await self.client.request(method, url, params=query, json=body, headers=request_headers)
+            except (httpx.TimeoutException, httpx.NetworkError) as e:
+                if method == 'POST' and not isinstance(e, httpx.ConnectTimeout):
+                    raise
+                last_error = e
+                if attempt < self.MAX_ATTEMPTS - 1:
+                    print('Request failed to connect or timed out, retrying with backoff')
+                    await asyncio.sleep(BolAPI._backoff_delay(attempt))
+                continue
+
+            # Check if request has been denied due to token expiration
+            status_code = request.status_code
+            if status_code == 401:
+                print('Token expired, acquiring new one...')
+                await self.get_access_token(stale=request_headers.get('Authorization'))
+                request_headers = {**self.backend.headers, **self.headers, **(headers or {})}
+                continue
+
+            if status_code == 429:
+                if attempt < self.MAX_ATTEMPTS - 1:
+                    delay = BolAPI._retry_after_delay(request.headers.get('Retry-After'), attempt)
+                    print(f'Too many requests, retrying after {delay:.0f} seconds')
+                    await asyncio.sleep(delay)
+                continue
+
+            return status_code, request
+
+        raise RuntimeError(f'{method} {url} failed after {self.MAX_ATTEMPTS} attempts') from last_error
+
+    async def get(self, url: str, data: Optional[dict] = None, headers: Optional[dict] = None, params: Optional[dict] = None) -> Response:
+        status, response = await self.request('GET', url, data, headers, params)
+        return status, response
+
+    async def post(self, url: str, data: Optional[dict] = None, headers: Optional[dict] = None, params: Optional[dict] = None) -> Response:
+        status, response = await self.request('POST', url, data, headers, params)
+        return status, response
+
+    async def put(self, url: str, data: Optional[dict] = None, headers: Optional[dict] = None, params: Optional[dict] = None) -> Response:
+        status, response = await self.request('PUT', url, data, headers, params)
+        return status, response
+
+    async def aclose(self) -> None:
+        """ Close all pooled connections of the client
+        """
+        if self.client is not None:
+            await self.client.aclose()
+        self.client = None
+        self._token_lock = None
+        self._loop = None
+
+    async def request_offer(self, offer_id: str) -> Json:
+        """ Retrieve an offer by its ID
+
+        See BolRetailerAPI.request_offer
+        """
+        endpoint_url = f'retailer/offers/{offer_id}'
+        status, response = await self.get(endpoint_url)
+        if status == 200:
+            return response.json()
+        else:
+            print(f'ERROR: failed to retrieve offer \n{response.text}')
+
+    async def request_offer_forecast(self, offer_id: str, weeks: int) -> Tuple[float, float]:
+        """ Retrieve sales forecast of an offer
+
+        See BolRetailerAPI.request_offer_forecast
+        """
+        data = {
+            'offer-id': offer_id,
+            'weeks-ahead': weeks
+        }
+        endpoint_url = 'retailer/insights/sales-forecast'
+
+        status, response = await self.get(endpoint_url, data=data)
+
+        if status == 200:
+            total = response.json()['total']
+            return total['minimum'], total['maximum']
+
+        else: print(f'ERROR: failed to retrieve offer sales forecast \n{response.text}')
+
+    async def request_product_ratings(self, ean: str) -> Dict[int, int]:
+        """ Retrieve product ratings by EAN
+
+        See BolRetailerAPI.request_product_ratings
+        """
+        dict_data = {
+            'Rating' : [],
+            'Count' : []
+        }
+
+        endpoint_url = f'retailer/products/{ean}/ratings'
+        status, response = await self.get(endpoint_url)
+
+        if status == 200:
+            for i in response.json()['ratings']:
+                dict_data['Rating'].append(i['rating'])
+                dict_data['Count'].append(i['count'])
+
+        return dict_data
+
+    async def request_offers_bulk(self, offer_ids: List[str]) -> List[Json]:
+        """ Retrieve multiple offers concurrently
+
+        Parameters
+        ----------
+        offer_ids : list
+            The IDs of the offers
+
+        Returns
+        -------
+        list
+            Offer details per offer ID, exceptions are returned in place of failed requests
+        """
+        return await asyncio.gather(*(self.request_offer(o) for o in offer_ids), return_exceptions=True)
+
+    async def request_offer_forecasts_bulk(self, offer_ids: List[str], weeks: int) -> List[Tuple[float, float]]:
+        """ Retrieve sales forecasts of multiple offers concurrently
+
+        Parameters
+        ----------
+        offer_ids : list
+            The IDs of the offers
+        weeks : int
+            The requested no. weeks ahead
+
+        Returns
+        -------
+        list
+            (minimum, maximum) per offer ID, exceptions are returned in place of failed requests
+        """
+        return await asyncio.gather(*(self.request_offer_forecast(o, weeks) for o in offer_ids), return_exceptions=True)
+
+    async def request_product_ratings_bulk(self, eans: List[str]) -> List[Dict[int, int]]:
+        """ Retrieve ratings of multiple products concurrently
+
+        Parameters
+        ----------
+        eans : list
+            EANs of products
+
+        Returns
+        -------
+        list
+            Ratings per EAN, exceptions are returned in place of failed requests
+        """
+        return await asyncio.gather(*(self.request_product_ratings(e) for e in eans), return_exceptions=True)
+
 class BolAdvertisingAPI(BolAPI):
     """ Initializes API connection with bol Advertising API v11 ALPHA
 
@@ -444,38 +1072,35 @@ class BolAdvertisingAPI(BolAPI):
         Obtain performance results of all campaign for requested period
     """
 
-    def __init__(self, client_id: str, client_secret: str):
-        super().__init__(client_id, client_secret)
+    def __init__(self, client_id: Optional[str] = None, client_secret: Optional[str] = None, backend: Optional[_HTTPBackend] = None) -> None:
+        super().__init__(client_id, client_secret, backend)
         self.headers = {
             'Accept' : 'application/vnd.advertiser.v11+json',
             'Content-Type' : 'application/vnd.advertiser.v11+json'
         }
-        self.get_access_token()
+        self._ensure_access_token()
     
 
     def request_bulk_report(self, entity_type: str, start_date: str, end_date: str):
-        endpoint_url = f'advertiser/sponsored-products/reporting/bulk-reports?entity-type={entity_type}&start-date={start_date}&end-date={end_date}'
-        status, response = self.post(endpoint_url)
+        params = {
+            'entity-type' : entity_type,
+            'start-date' : start_date,
+            'end-date' : end_date
+        }
+        endpoint_url = 'advertiser/sponsored-products/reporting/bulk-reports'
+        status, response = self.post(endpoint_url, params=params)
 
         if status == 202:
             # Check status of offer export
-            process_id = response.json()['processStatusId']
-            endpoint_url = f'shared/process-status/{process_id}'
-            _, process = self.get(endpoint_url)
-            
-            while process.json()['status'] == 'PENDING':
-                time.sleep(60) # Wait 60 seconds
-                _, process = self.get(endpoint_url)
+            process_json = self._await_process(response.json()['processStatusId'])
             
-            if process.json()['status'] == 'SUCCESS':
-                report_id = process.json()['entityId']
+            if process_json['status'] == 'SUCCESS':
+                report_id = process_json['entityId']
                 endpoint_url = f'advertiser/sponsored-products/reporting/bulk-reports/{report_id}'
                 status, response = self.get(endpoint_url)
                 if status == 200:
                     download_url = response.json()['url']
-                    report = requests.get(download_url)
-
-                    return pd.read_csv(StringIO(report.content.decode('utf-8')))
+                    return self._download_csv(download_url)
                 
                 else: print(f'ERROR: failed to retrieve campaign performance \n{response.text}')
 
@@ -492,13 +1117,13 @@ class BolAdvertisingAPIv10(BolAPI):
         Obtain performance results of all campaign for requested period
     """
 
-    def __init__(self, client_id: str, client_secret: str):
-        super().__init__(client_id, client_secret)
+    def __init__(self, client_id: Optional[str] = None, client_secret: Optional[str] = None, backend: Optional[_HTTPBackend] = None) -> None:
+        super().__init__(client_id, client_secret, backend)
         self.headers = {
             'Accept' : 'application/vnd.advertiser.v10+json',
             'Content-Type' : 'application/vnd.advertiser.v10+json'
         }
-        self.get_access_token()
+        self._ensure_access_token()
     
 
     def request_campaigns_report(self, start_date: str, end_date: str):
@@ -547,28 +1172,24 @@ class BolAdvertisingAPIv10(BolAPI):
             pd.DataFrame                
                 DataFrame with performance results of all campaigns for requested period.
         """
-        endpoint_url = f'advertiser/sponsored-products/campaign-performance/reports?start-date={start_date}&end-date={end_date}'
-        status, response = self.post(endpoint_url)
+        params = {
+            'start-date' : start_date,
+            'end-date' : end_date
+        }
+        endpoint_url = 'advertiser/sponsored-products/campaign-performance/reports'
+        status, response = self.post(endpoint_url, params=params)
 
         if status == 202:
             # Check status of offer export
-            process_id = response.json()['processStatusId']
-            endpoint_url = f'shared/process-status/{process_id}'
-            _, process = self.get(endpoint_url)
-            
-            while process.json()['status'] == 'PENDING':
-                time.sleep(60) # Wait 60 seconds
-                _, process = self.get(endpoint_url)
+            process_json = self._await_process(response.json()['processStatusId'])
             
-            if process.json()['status'] == 'SUCCESS':
-                report_id = process.json()['entityId']
+            if process_json['status'] == 'SUCCESS':
+                report_id = process_json['entityId']
                 endpoint_url = f'advertiser/sponsored-products/campaign-performance/reports/{report_id}'
                 status, response = self.get(endpoint_url)
                 if status == 200:
                     download_url = response.json()['url']
-                    report = requests.get(download_url)
-
-                    return pd.read_csv(StringIO(report.content.decode('utf-8')))
+                    return self._download_csv(download_url)
                 
                 else: print(f'ERROR: failed to retrieve campaign performance \n{response.text}')
 
@@ -578,26 +1199,56 @@ class BolAdvertisingAPIv10(BolAPI):
 
 
 class BolAdvertisingAPIv9(BolAPI):
-    def __init__(self, client_id: str, client_secret: str) -> None:
-        super().__init__(client_id, client_secret)
+    def __init__(self, client_id: Optional[str] = None, client_secret: Optional[str] = None, backend: Optional[_HTTPBackend] = None) -> None:
+        super().__init__(client_id, client_secret, backend)
         self.headers = {
             'Accept' : 'application/vnd.advertiser.v9+json',
             'Content-Type' : 'application/vnd.advertiser.v9+json'
         }
-        self.get_access_token()
+        self._ensure_access_token()
 
     def request_adgroups(self, campaign_id: str):
-        endpoint_url = f'advertiser/sponsored-products/ad-groups?campaign-id={campaign_id}'
-        status, response = self.get(endpoint_url)
+        data = {'campaign-id' : campaign_id}
+        endpoint_url = 'advertiser/sponsored-products/ad-groups'
+        status, response = self.get(endpoint_url, data=data)
 
         if status == 200:
             return response.json()
         else: print(f'ERROR: failed to retrieve campaign ad-groups \n{response.text}')
 
     def request_targetproducts(self, adgroup_id: str):
-        endpoint_url = f'advertiser/sponsored-products/target-products?ad-group-id={adgroup_id}'
-        status, response = self.get(endpoint_url)
+        data = {'ad-group-id' : adgroup_id}
+        endpoint_url = 'advertiser/sponsored-products/target-products'
+        status, response = self.get(endpoint_url, data=data)
 
         if status == 200:
             return response.json()
-        else: print(f'ERROR: failed to retrieve ad-group target-products \n{response.text}')
\ No newline at end of file
+        else: print(f'ERROR: failed to retrieve ad-group target-products \n{response.text}')
+
+
+def bol_clients(client_id: str, client_secret: str) -> Tuple[BolRetailerAPI, BolAdvertisingAPIv10, BolAdvertisingAPI]:
+    """ Initialize Retailer and Advertising API connections sharing one backend
+
+    All returned API classes reuse the same pooled session and access token.
+
+    Parameters
+    ----------
+    client_id : str
+        ID from client credentials
+    client_secret : str
+        Secret from client credentials
+
+    Returns
+    -------
+    retailer : BolRetailerAPI
+        Retailer API connection
+    advertiser_v10 : BolAdvertisingAPIv10
+        Advertising API v10 connection
+    advertiser_v11 : BolAdvertisingAPI
+        Advertising API v11 connection
+    """
+    backend = _HTTPBackend(client_id, client_secret)
+    retailer = BolRetailerAPI(backend=backend)
+    advertiser_v10 = BolAdvertisingAPIv10(backend=backend)
+    advertiser_v11 = BolAdvertisingAPI(backend=backend)
+    return retailer, advertiser_v10, advertiser_v11
@@ -1 +1 @@
-from .BolAPI import BolAPI, BolAdvertisingAPI, BolRetailerAPI, BolAdvertisingAPIv9, BolAdvertisingAPIv10
\ No newline at end of file
+from .BolAPI import BolAPI, BolAdvertisingAPI, BolRetailerAPI, AsyncBolRetailerAPI, BolAdvertisingAPIv9, BolAdvertisingAPIv10, bol_clients
\ No newline at end of file
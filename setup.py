@@ -10,7 +10,7 @@ setuptools.setup(
     install_requires=[
         'pandas',
         'requests',
-        'numpy',
+        'httpx[http2]',
         'Pillow',
         'openpyxl'
     ]